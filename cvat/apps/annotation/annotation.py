@@ -3,6 +3,7 @@
 # SPDX-License-Identifier: MIT
 
 import os
+import sys
 import copy
 from collections import OrderedDict, namedtuple
 
@@ -15,9 +16,9 @@ class AnnotationIR:
     def __init__(self, data=None):
         self.reset()
         if data:
-            self._tags   = getattr(data, 'tags', []) or data['tags']
-            self._shapes = getattr(data, 'shapes', []) or data['shapes']
-            self._tracks = getattr(data, 'tracks', []) or data['tracks']
+            self._tags   = getattr(data, 'tags', None) or data['tags']
+            self._shapes = getattr(data, 'shapes', None) or data['shapes']
+            self._tracks = getattr(data, 'tracks', None) or data['tracks']
 
     def add_tag(self, tag):
         self._tags.append(tag)
@@ -120,6 +121,8 @@ class Annotation:
         self._MAX_ANNO_SIZE=30000
         self._frame_info = {}
         self._frame_mapping = {}
+        # frame step is parsed from the frame filter, so do it only once
+        self._frame_step = self._db_task.get_frame_step()
 
         db_labels = self._db_task.label_set.all().prefetch_related('attributespec_set').order_by('pk')
 
@@ -141,33 +144,41 @@ class Annotation:
                 **attr_mapping['immutable'],
             }
 
+        # reverse mappings to look up ids by names without scanning all labels.
+        # Names are interned like the ones parsed by the CVAT XML loader, so its
+        # lookups find identical keys
+        self._label_ids = {}
+        for label_id, db_label in self._label_mapping.items():
+            self._label_ids.setdefault(sys.intern(db_label.name), label_id)
+
+        self._attribute_names = {}
+        self._attribute_ids = {}
+        for label_id, attr_mapping in self._attribute_mapping.items():
+            attr_ids = {None: {}}
+            for attr_type, container in attr_mapping.items():
+                attr_ids[attr_type] = {}
+                for attr_id, attr_name in container.items():
+                    self._attribute_names.setdefault(attr_id, attr_name)
+                    attr_ids[attr_type].setdefault(sys.intern(attr_name), attr_id)
+            for attr_id, attr_name in self._attribute_mapping_merged[label_id].items():
+                attr_ids[None].setdefault(sys.intern(attr_name), attr_id)
+            self._attribute_ids[label_id] = attr_ids
+
         self._init_frame_info()
-        self._init_meta()
+        # meta is needed only for dumping, so it is built on first access
+        self._meta = None
 
     def _get_label_id(self, label_name):
-        for db_label in self._label_mapping.values():
-            if label_name == db_label.name:
-                return db_label.id
-        return None
+        return self._label_ids.get(label_name)
 
     def _get_label_name(self, label_id):
         return self._label_mapping[label_id].name
 
     def _get_attribute_name(self, attribute_id):
-        for attribute_mapping in self._attribute_mapping_merged.values():
-            if attribute_id in attribute_mapping:
-                return attribute_mapping[attribute_id]
+        return self._attribute_names.get(attribute_id)
 
     def _get_attribute_id(self, label_id, attribute_name, attribute_type=None):
-        if attribute_type:
-            container = self._attribute_mapping[label_id][attribute_type]
-        else:
-            container = self._attribute_mapping_merged[label_id]
-
-        for attr_id, attr_name in container.items():
-            if attribute_name == attr_name:
-                return attr_id
-        return None
+        return self._attribute_ids[label_id][attribute_type].get(attribute_name)
 
     def _get_mutable_attribute_id(self, label_id, attribute_name):
         return self._get_attribute_id(label_id, attribute_name, 'mutable')
@@ -258,19 +269,15 @@ class Annotation:
             self._meta["source"] = str(os.path.basename(self._db_task.video.path))
 
     def _export_attributes(self, attributes):
-        exported_attributes = []
-        for attr in attributes:
-            attribute_name = self._get_attribute_name(attr["spec_id"])
-            exported_attributes.append(Annotation.Attribute(
-                name=attribute_name,
-                value=attr["value"],
-            ))
-        return exported_attributes
+        return [Annotation.Attribute(
+            name=self._get_attribute_name(attr["spec_id"]),
+            value=attr["value"],
+        ) for attr in attributes]
 
     def _export_tracked_shape(self, shape):
         return Annotation.TrackedShape(
             type=shape["type"],
-            frame=self._db_task.start_frame + shape["frame"] * self._db_task.get_frame_step(),
+            frame=self._db_task.start_frame + shape["frame"] * self._frame_step,
             points=shape["points"],
             occluded=shape["occluded"],
             outside=shape.get("outside", False),
@@ -283,7 +290,7 @@ class Annotation:
         return Annotation.LabeledShape(
             type=shape["type"],
             label=self._get_label_name(shape["label_id"]),
-            frame=self._db_task.start_frame + shape["frame"] * self._db_task.get_frame_step(),
+            frame=self._db_task.start_frame + shape["frame"] * self._frame_step,
             points=shape["points"],
             occluded=shape["occluded"],
             z_order=shape.get("z_order", 0),
@@ -293,7 +300,7 @@ class Annotation:
 
     def _export_tag(self, tag):
         return Annotation.Tag(
-            frame=self._db_task.start_frame + tag["frame"] * self._db_task.get_frame_step(),
+            frame=self._db_task.start_frame + tag["frame"] * self._frame_step,
             label=self._get_label_name(tag["label_id"]),
             group=tag.get("group", 0),
             attributes=self._export_attributes(tag["attributes"]),
@@ -301,14 +308,14 @@ class Annotation:
 
     def group_by_frame(self):
         def _get_frame(annotations, shape):
-            db_image = self._frame_info[shape["frame"]]
-            frame = self._db_task.start_frame + shape["frame"] * self._db_task.get_frame_step()
-            rpath = db_image['path'].split(os.path.sep)
-            if len(rpath) != 1:
-                rpath = os.path.sep.join(rpath[rpath.index(".upload")+1:])
-            else:
-                rpath = rpath[0]
+            frame = self._db_task.start_frame + shape["frame"] * self._frame_step
             if frame not in annotations:
+                db_image = self._frame_info[shape["frame"]]
+                rpath = db_image['path'].split(os.path.sep)
+                if len(rpath) != 1:
+                    rpath = os.path.sep.join(rpath[rpath.index(".upload")+1:])
+                else:
+                    rpath = rpath[0]
                 annotations[frame] = Annotation.Frame(
                     frame=frame,
                     name=rpath,
@@ -354,6 +361,8 @@ class Annotation:
 
     @property
     def meta(self):
+        if self._meta is None:
+            self._init_meta()
         return self._meta
 
     def _import_tag(self, tag):
@@ -22,6 +22,13 @@ format_spec = {
     ],
 }
 
+# Segmentation which replaces segments that became empty after cropping, because
+# cocoapi cannot process empty ones. Such segments are not written to output
+EMPTY_SEGMENTATION = [[0.0, 0.0, 0.0, 0.0, 0.0, 0.0]]
+
+# Fields of output annotations which are stored column-wise until they are written
+ANNOTATION_FIELDS = ('category_id', 'id', 'image_id', 'segmentation', 'area', 'bbox')
+
 def mask_to_polygon(mask, tolerance=1.0, area_threshold=1):
     """Convert object's mask to polygon [[x1,y1, x2,y2 ...], [...]]
     Args:
@@ -45,11 +52,8 @@ def mask_to_polygon(mask, tolerance=1.0, area_threshold=1):
         contour = measure.approximate_polygon(contour, tolerance)
         if len(contour) > 2:
             contour = np.flip(contour, axis=1)
-            reshaped_contour = []
-            for xy in contour:
-                reshaped_contour.append(xy[0])
-                reshaped_contour.append(xy[1])
-            reshaped_contour = [point if point > 0 else 0 for point in reshaped_contour]
+            # interleave (x, y) pairs and clip negative coordinates in one pass
+            reshaped_contour = np.maximum(contour, 0).ravel().tolist()
 
             # Check if area of a polygon is enough
             rle = mask_util.frPyObjects([reshaped_contour], mask.shape[0], mask.shape[1])
@@ -58,6 +62,24 @@ def mask_to_polygon(mask, tolerance=1.0, area_threshold=1):
                 polygons.append(reshaped_contour)
     return polygons
 
+def rle_to_mask(rle):
+    """Convert object's RLE to mask of the size stored in the RLE
+    Args:
+        rle: object's segmentation in COCO RLE format (compressed or uncompressed)
+    """
+    from pycocotools import mask as mask_util
+    import numpy as np
+
+    if isinstance(rle['counts'], list):
+        # uncompressed RLE holds column-major run lengths which
+        # alternate between 0 and 1, starting from 0
+        counts = rle['counts']
+        height, width = rle['size']
+        values = np.arange(len(counts), dtype=np.uint8) % 2
+        return np.repeat(values, counts).reshape((height, width), order='F')
+
+    return mask_util.decode(rle)
+
 def dump(file_object, annotations):
     import numpy as np
     import json
@@ -81,16 +103,19 @@ def dump(file_object, annotations):
             ratio_tolerance: used for situation when one object is fully or almost fully
                 inside another one and we don't want make "hole" in one of objects
         """
-        empty_polygon = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+        # Points of the objects are changed only while they are at the bottom,
+        # so RLEs and areas of the objects above can be computed once
+        rles = [mask_util.frPyObjects([polygon['points']], height, width) for polygon in polygons]
+        areas = [sum(mask_util.area(rle)) for rle in rles]
 
         for i, _ in enumerate(polygons):
-            rle_bottom = mask_util.frPyObjects([polygons[i]['points']], height, width)
+            rle_bottom = rles[i]
+            area_bottom = areas[i]
             segment_overlapped = False
             for j in range(i + 1, len(polygons)):
-                rle_top = mask_util.frPyObjects([polygons[j]['points']], height, width)
+                rle_top = rles[j]
                 iou = mask_util.iou(rle_bottom, rle_top, [0, 0])
-                area_top = sum(mask_util.area(rle_top))
-                area_bottom = sum(mask_util.area(rle_bottom))
+                area_top = areas[j]
                 if area_bottom == 0:
                     continue
                 area_ratio = area_top / area_bottom
@@ -106,26 +131,25 @@ def dump(file_object, annotations):
 
                 if sum_iou[0] > threshold:
                     segment_overlapped = True
-                    bottom_mask = np.array(mask_util.decode(rle_bottom), dtype=np.uint8)
-                    top_mask = np.array(mask_util.decode(rle_top), dtype=np.uint8)
-
-                    bottom_mask = np.subtract(bottom_mask, top_mask)
-                    bottom_mask[bottom_mask > 1] = 0
-
-                    bottom_mask = np.sum(bottom_mask, axis=2)
-                    bottom_mask = np.array(bottom_mask > 0, dtype=np.uint8)
+                    # Keep pixels of the bottom object which are not covered by the top one.
+                    # Decoded masks are uint8 already, so they are reduced without extra copies
+                    bottom_mask = mask_util.decode(rle_bottom).any(axis=2)
+                    top_mask = mask_util.decode(rle_top).any(axis=2)
+                    bottom_mask = np.logical_and(bottom_mask, np.logical_not(top_mask, out=top_mask),
+                        out=bottom_mask).view(np.uint8)
                     polygons[i]['points'] = mask_to_polygon(bottom_mask, area_threshold=area_threshold)
                     # If some segment is empty, do small fix to avoid error in cocoapi function
                     if len(polygons[i]['points']) == 0:
-                        polygons[i]['points'] = [empty_polygon]
+                        polygons[i]['points'] = EMPTY_SEGMENTATION
                     rle_bottom = mask_util.frPyObjects(polygons[i]['points'], height, width)
+                    area_bottom = sum(mask_util.area(rle_bottom))
             if not segment_overlapped:
                 polygons[i]['points'] = [polygons[i]['points']]
 
         output_polygons = []
         for polygon in polygons:
             poly_len = len(polygon['points'])
-            if poly_len != 0 and polygon['points'] != [empty_polygon]:
+            if poly_len != 0 and polygon['points'] != EMPTY_SEGMENTATION:
                 output_polygons.append(polygon)
 
         return output_polygons
@@ -232,25 +256,67 @@ def dump(file_object, annotations):
         result_annotation['images'].append(new_img)
 
 
-    def insert_annotation_data(image, category_map, segm_id, obj, result_annotation):
+    def insert_annotation_data(image, category_map, segm_id, obj, annotation_columns):
         """Get data from input annotation for object and fill fields for this object in output annotation
         Args:
             image: dictionary with data for image from input CVAT annotation
             category_map: map for categories represented in the annotation {name: id}
             segm_id: identificator of current object
             obj: includes data for the object [label, polygon]
-            result_annotation: output annotation in COCO representation
+            annotation_columns: fields of output annotations stored column-wise
         """
-        new_anno = OrderedDict()
-        new_anno['category_id'] = category_map[obj['label']]
-        new_anno['id'] = segm_id
-        new_anno['image_id'] = image.frame
-        new_anno['iscrowd'] = 0
-        new_anno['segmentation'] = obj['points']
         area, bbox = polygon_area_and_bbox(obj['points'], image.height, image.width)
-        new_anno['area'] = float(np.sum(area))
-        new_anno['bbox'] = bbox
-        result_annotation['annotations'].append(new_anno)
+        annotation_columns['category_id'].append(category_map[obj['label']])
+        annotation_columns['id'].append(segm_id)
+        annotation_columns['image_id'].append(image.frame)
+        annotation_columns['segmentation'].append(obj['points'])
+        annotation_columns['area'].append(float(np.sum(area)))
+        annotation_columns['bbox'].append(bbox)
+
+
+    def annotation_records(annotation_columns):
+        """Build objects in COCO representation one by one from column-wise storage,
+            so only the record which is being written exists as a dictionary
+        Args:
+            annotation_columns: fields of output annotations stored column-wise
+        """
+        columns = (annotation_columns[field] for field in ANNOTATION_FIELDS)
+        for category_id, segm_id, image_id, segmentation, area, bbox in zip(*columns):
+            yield OrderedDict([
+                ('category_id', category_id),
+                ('id', segm_id),
+                ('image_id', image_id),
+                ('iscrowd', 0),
+                ('segmentation', segmentation),
+                ('area', area),
+                ('bbox', bbox),
+            ])
+
+
+    def write_annotation(result_annotation, file_object):
+        """Write annotation to the file record by record to avoid serializing
+            the whole document into a single string in memory
+        Args:
+            result_annotation: output annotation in COCO representation
+            file_object: binary file object for output annotation
+        """
+        # one-shot encoding of every record uses C implementation of JSON encoder
+        encoder = json.JSONEncoder(separators=(',', ':'))
+        file_object.write(b'{')
+        for key_idx, (key, value) in enumerate(result_annotation.items()):
+            if key_idx:
+                file_object.write(b',')
+            file_object.write('{}:'.format(encoder.encode(key)).encode())
+            if isinstance(value, dict):
+                file_object.write(encoder.encode(value).encode())
+            else:
+                file_object.write(b'[')
+                for record_idx, record in enumerate(value):
+                    if record_idx:
+                        file_object.write(b',')
+                    file_object.write(encoder.encode(record).encode())
+                file_object.write(b']')
+        file_object.write(b'}')
 
     result_annotation = OrderedDict([
         ('licenses', []),
@@ -259,11 +325,13 @@ def dump(file_object, annotations):
         ('images', []),
         ('annotations', []),
     ])
+    annotation_columns = {field: [] for field in ANNOTATION_FIELDS}
 
     insert_license_data(result_annotation)
     insert_info_data(annotations, result_annotation)
     category_map = insert_categories_data(annotations, result_annotation)
 
+    z_order_enabled = annotations.meta['task']['z_order'] == 'True'
     segm_id = 1
     for img in annotations.group_by_frame():
         polygons = []
@@ -290,7 +358,7 @@ def dump(file_object, annotations):
 
         # Create new image
         insert_image_data(img, result_annotation)
-        if annotations.meta['task']['z_order'] == 'True':
+        if z_order_enabled:
             polygons = fix_segments_intersections(polygons, img.height, img.width, img.name)
         else:
             for polygon in polygons:
@@ -316,10 +384,11 @@ def dump(file_object, annotations):
 
         # Create new annotation for this image
         for poly in polygons:
-            insert_annotation_data(img, category_map, segm_id, poly, result_annotation)
+            insert_annotation_data(img, category_map, segm_id, poly, annotation_columns)
             segm_id += 1
 
-    file_object.write(json.dumps(result_annotation, indent=2).encode())
+    result_annotation['annotations'] = annotation_records(annotation_columns)
+    write_annotation(result_annotation, file_object)
     file_object.flush()
 
     # Try to load created annotation via cocoapi
@@ -330,8 +399,6 @@ def dump(file_object, annotations):
 
 def load(file_object, annotations):
     from pycocotools import coco as coco_loader
-    from pycocotools import mask as mask_utils
-    import numpy as np
 
     coco = coco_loader.COCO(file_object.name)
     labels={cat['id']: cat['name'] for cat in coco.loadCats(coco.getCatIds())}
@@ -352,14 +419,7 @@ def load(file_object, annotations):
                     polygons = [polygon for polygon in ann['segmentation'] if polygon]
                 # mask
                 else:
-                    if isinstance(ann['segmentation']['counts'], list):
-                        rle = mask_utils.frPyObjects([ann['segmentation']], img['height'], img['width'])
-                    else:
-                        rle = [ann['segmentation']]
-
-                    mask = np.array(mask_utils.decode(rle), dtype=np.uint8)
-                    mask = np.sum(mask, axis=2)
-                    mask = np.array(mask > 0, dtype=np.uint8)
+                    mask = rle_to_mask(ann['segmentation'])
                     polygons = mask_to_polygon(mask)
 
                 if len(polygons) > 1:
@@ -343,20 +343,33 @@ def dump_as_cvat_interpolation(file_object, annotations):
 
 def load(file_object, annotations):
     import xml.etree.ElementTree as et
+    import sys
     context = et.iterparse(file_object, events=("start", "end"))
     context = iter(context)
     ev, _ = next(context)
 
-    supported_shapes = ('box', 'polygon', 'polyline', 'points')
+    # XML tags of supported shapes and their types
+    supported_shapes = {
+        'box': 'rectangle',
+        'polygon': 'polygon',
+        'polyline': 'polyline',
+        'points': 'points',
+    }
 
     track = None
     shape = None
     image_is_opened = False
+    # Attributes are immutable and the same name/value pairs are repeated for
+    # many objects, so only one Attribute is created for every pair
+    attributes = {}
     for ev, el in context:
         if ev == 'start':
+            # Label and attribute names are repeated for every object, so they are interned
+            # to keep one copy of each name. Name indexes of Annotation use interned keys
+            # too, so lookups of these names find identical objects
             if el.tag == 'track':
                 track = annotations.Track(
-                    label=el.attrib['label'],
+                    label=sys.intern(el.attrib['label']),
                     group=int(el.attrib.get('group_id', 0)),
                     shapes=[],
                 )
@@ -370,10 +383,13 @@ def load(file_object, annotations):
                 }
         elif ev == 'end':
             if el.tag == 'attribute' and shape is not None:
-                shape['attributes'].append(annotations.Attribute(
-                    name=el.attrib['name'],
-                    value=el.text,
-                ))
+                attribute = (el.attrib['name'], el.text)
+                if attribute not in attributes:
+                    attributes[attribute] = annotations.Attribute(
+                        name=sys.intern(el.attrib['name']),
+                        value=el.text,
+                    )
+                shape['attributes'].append(attributes[attribute])
             if el.tag in supported_shapes:
                 if track is not None:
                     shape['frame'] = el.attrib['frame']
@@ -381,10 +397,10 @@ def load(file_object, annotations):
                     shape['keyframe'] = el.attrib['keyframe'] == "1"
                 else:
                     shape['frame'] = frame_id
-                    shape['label'] = el.attrib['label']
+                    shape['label'] = sys.intern(el.attrib['label'])
                     shape['group'] = int(el.attrib.get('group_id', 0))
 
-                shape['type'] = 'rectangle' if el.tag == 'box' else el.tag
+                shape['type'] = supported_shapes[el.tag]
                 shape['occluded'] = el.attrib['occluded'] == '1'
                 shape['z_order'] = int(el.attrib.get('z_order', 0))
 
@@ -394,8 +410,7 @@ def load(file_object, annotations):
                     shape['points'].append(el.attrib['xbr'])
                     shape['points'].append(el.attrib['ybr'])
                 else:
-                    for pair in el.attrib['points'].split(';'):
-                        shape['points'].extend(map(float, pair.split(',')))
+                    shape['points'].extend(map(float, el.attrib['points'].replace(';', ',').split(',')))
 
                 if track is not None:
                     if shape["keyframe"]:
@@ -17,7 +17,7 @@ format_spec = {
 }
 
 def dump(file_object, annotations):
-    from zipfile import ZipFile
+    from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
     import numpy as np
     import os
     from pycocotools import mask as maskUtils
@@ -45,12 +45,14 @@ def dump(file_object, annotations):
 
         return [xtl, ytl, xbr, ytl, xbr, ybr, xtl, ybr]
 
-    colormap = genearte_pascal_colormap()
+    # colors are kept as 8-bit values, so masks are drawn directly in the PNG pixel format
+    colormap = genearte_pascal_colormap().astype(np.uint8)
     labels = [label[1]["name"] for label in annotations.meta["task"]["labels"] if label[1]["name"] != 'background']
     labels.insert(0, 'background')
     label_colors = OrderedDict((label, colormap[idx]) for idx, label in enumerate(labels))
 
-    with ZipFile(file_object, "w") as output_zip:
+    # PNG masks are already compressed, so only text entries are deflated
+    with ZipFile(file_object, "w", compression=ZIP_DEFLATED) as output_zip:
         for frame_annotation in annotations.group_by_frame():
             image_name = frame_annotation.name
             annotation_name = "{}.png".format(os.path.splitext(os.path.basename(image_name))[0])
@@ -63,18 +65,16 @@ def dump(file_object, annotations):
             if not shapes:
                 continue
             shapes = sorted(shapes, key=lambda x: int(x.z_order))
-            img = np.zeros((height, width, 3))
+            img = np.zeros((height, width, 3), dtype=np.uint8)
             buf = io.BytesIO()
             for shape in shapes:
                 points = shape.points if shape.type != 'rectangle' else convert_box_to_polygon(shape.points)
                 rles = maskUtils.frPyObjects([points], height, width)
                 rle = maskUtils.merge(rles)
                 mask = maskUtils.decode(rle)
-                color = label_colors[shape.label] / 255
-                idx = (mask > 0)
-                img[idx] = color
+                img[mask > 0] = label_colors[shape.label]
 
             matplotlib.image.imsave(buf, img, format='png')
-            output_zip.writestr(annotation_name, buf.getvalue())
+            output_zip.writestr(annotation_name, buf.getvalue(), compress_type=ZIP_STORED)
         labels = '\n'.join('{}:{}'.format(label, ','.join(str(i) for i in color)) for label, color in label_colors.items())
         output_zip.writestr('colormap.txt', labels)
@@ -68,19 +68,32 @@ def load(file_object, annotations):
 def dump(file_object, annotations):
     from pascal_voc_writer import Writer
     import os
-    from zipfile import ZipFile
+    import copy
+    from zipfile import ZipFile, ZIP_DEFLATED
     from tempfile import TemporaryDirectory
 
+    # values of checkbox attributes which mean true, checked without lowering every value
+    true_values = frozenset(('true', 'True', 'TRUE'))
+
+    # Writer loads and compiles its template on construction, so it is done once
+    # for a prototype and every frame gets a copy with its own parameters.
+    # The parameters are filled in as Writer.__init__ of pascal_voc_writer==0.1.4
+    # does it, so they have to be checked again when that pinned version changes.
+    writer_prototype = Writer('', 0, 0)
+    writer_prototype.template_parameters['path'] = ''
+    writer_prototype.template_parameters['folder'] = ''
+
     with TemporaryDirectory() as out_dir:
-        with ZipFile(file_object, 'w') as output_zip:
+        with ZipFile(file_object, 'w', compression=ZIP_DEFLATED) as output_zip:
             for frame_annotation in annotations.group_by_frame():
                 image_name = frame_annotation.name
                 width = frame_annotation.width
                 height = frame_annotation.height
 
-                writer = Writer(image_name, width, height)
-                writer.template_parameters['path'] = ''
-                writer.template_parameters['folder'] = ''
+                writer = copy.copy(writer_prototype)
+                writer.template_parameters = dict(writer_prototype.template_parameters,
+                    filename=os.path.basename(os.path.abspath(image_name)),
+                    width=width, height=height, objects=[])
 
                 for shape in frame_annotation.labeled_shapes:
                     if shape.type != "rectangle":
@@ -95,9 +108,9 @@ def dump(file_object, annotations):
                     difficult = 0
                     truncated = 0
                     for attribute in shape.attributes:
-                        if attribute.name == 'truncated' and 'true' == attribute.value.lower():
+                        if attribute.name == 'truncated' and attribute.value in true_values:
                             truncated = 1
-                        elif attribute.name == 'difficult' and 'true' == attribute.value.lower():
+                        elif attribute.name == 'difficult' and attribute.value in true_values:
                             difficult = 1
 
                     writer.addObject(
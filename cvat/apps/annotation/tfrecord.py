@@ -30,6 +30,7 @@ def dump(file_object, annotations):
     import codecs
     from tempfile import TemporaryDirectory
     from collections import OrderedDict
+    import numpy as np
 
     # we need it to filter out non-ASCII characters otherwise
     # trainning will crash
@@ -51,31 +52,20 @@ def dump(file_object, annotations):
         return tf.train.Feature(float_list=tf.train.FloatList(value=value))
 
     # Defining the main conversion function
-    def create_tf_example(img_id, img_size, image_name, boxes, label_ids):
+    def create_tf_example(img_id, img_size, image_name, boxes, label_ids, label_texts):
         # Process one image data per run
         height = img_size[0]
         width = img_size[1]
 
-        xmins = [] # List of normalized left x coordinates in bounding box (1 per box)
-        xmaxs = [] # List of normalized right x coordinates in bounding box
-                    # (1 per box)
-        ymins = [] # List of normalized top y coordinates in bounding box (1 per box)
-        ymaxs = [] # List of normalized bottom y coordinates in bounding box
-                    # (1 per box)
-        classes_text = [] # List of string class name of bounding box (1 per box)
-        classes = [] # List of integer class id of bounding box (1 per box)
-
-        # Loop oer the boxes and fill the above fields
-        for box in boxes:
-            # filter out non-ASCII characters
-            box_name = ''.join(filter(lambda x: x in printable, box.label))
-
-            xmins.append(box.points[0] / width)
-            xmaxs.append(box.points[2] / width)
-            ymins.append(box.points[1] / height)
-            ymaxs.append(box.points[3] / height)
-            classes_text.append(box_name.encode('utf8'))
-            classes.append(label_ids[box.label])
+        # Coordinates of all boxes are stored column-wise in one array, so they are
+        # normalized at once instead of box by box
+        points = np.array([box.points for box in boxes], dtype=np.float64)
+        points /= (width, height, width, height)
+        # Lists of normalized left x, top y, right x and bottom y coordinates
+        # in bounding box (1 per box)
+        xmins, ymins, xmaxs, ymaxs = points.T.tolist()
+        classes_text = [label_texts[box.label] for box in boxes] # List of string class name of bounding box (1 per box)
+        classes = [label_ids[box.label] for box in boxes] # List of integer class id of bounding box (1 per box)
 
         tf_example = tf.train.Example(features=tf.train.Features(feature={
             'image/height': int64_feature(height),
@@ -93,6 +83,8 @@ def dump(file_object, annotations):
 
     # Create the label map file
     label_ids = OrderedDict((label[1]["name"], idx) for idx, label in enumerate(annotations.meta["task"]["labels"]))
+    # filter out non-ASCII characters
+    label_texts = {label: ''.join(filter(lambda x: x in printable, label)).encode('utf8') for label in label_ids}
     with TemporaryDirectory() as out_dir:
         labelmap_file = 'label_map.pbtxt'
         with codecs.open(os.path.join(out_dir, labelmap_file), 'w', encoding='utf8') as f:
@@ -114,6 +106,7 @@ def dump(file_object, annotations):
                     image_name=frame_annotation.name,
                     boxes=boxes,
                     label_ids=label_ids,
+                    label_texts=label_texts,
                 )
                 writer.write(tf_example.SerializeToString())
 
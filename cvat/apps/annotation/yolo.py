@@ -84,7 +84,7 @@ def load(file_object, annotations):
                     parse_yolo_file(os.path.join(dirpath, file), labels_mapping)
 
 def dump(file_object, annotations):
-    from zipfile import ZipFile
+    from zipfile import ZipFile, ZIP_DEFLATED
     import os
 
     # convertation formulas are based on https://github.com/pjreddie/darknet/blob/master/scripts/voc_label.py
@@ -100,7 +100,7 @@ def dump(file_object, annotations):
 
     labels_ids = {label[1]["name"]: idx for idx, label in enumerate(annotations.meta["task"]["labels"])}
 
-    with ZipFile(file_object, "w") as output_zip:
+    with ZipFile(file_object, "w", compression=ZIP_DEFLATED) as output_zip:
         for frame_annotation in annotations.group_by_frame():
             image_name = frame_annotation.name
             annotation_name = "{}.txt".format(os.path.splitext(os.path.basename(image_name))[0])
@@ -3,10 +3,11 @@
 # SPDX-License-Identifier: MIT
 
 import os
+import re
+import time
 from enum import Enum
 from collections import OrderedDict
 from django.utils import timezone
-from PIL import Image
 
 from django.conf import settings
 from django.db import transaction
@@ -134,6 +135,31 @@ def dump_task_data(pk, user, filename, dumper, scheme, host):
 
     annotation.dump(filename, dumper, scheme, host)
 
+# Dump files are saved into a task directory as
+# <filename>.<username>.<timestamp>.<format> (see TaskViewSet.dump)
+DUMP_FILE_RE = re.compile(r'^.+\.\d{4}_\d{2}_\d{2}_\d{2}_\d{2}_\d{2}\.[^.]+$')
+
+def clear_dump_files(max_age):
+    """Remove annotation dump files older than max_age seconds from all task directories"""
+    now = time.time()
+    for task_dir in os.scandir(settings.DATA_ROOT):
+        # A task can be deleted during the sweep, so errors are handled
+        # for every task directory and every file separately
+        try:
+            if not task_dir.is_dir():
+                continue
+            entries = list(os.scandir(task_dir.path))
+        except OSError:
+            continue
+
+        for entry in entries:
+            try:
+                if entry.is_file() and DUMP_FILE_RE.match(entry.name) and \
+                    now - entry.stat().st_mtime > max_age:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
 def bulk_create(db_model, objects, flt_param):
     if objects:
         if flt_param:
@@ -155,6 +181,15 @@ def _merge_table_rows(rows, keys_for_merge, field_id):
     # than next_box.frame.
     merged_rows = OrderedDict()
 
+    # Short names of merged fields are computed once. The id field of a merged
+    # key tells if a row has a child object at all (it is None for rows of
+    # a LEFT JOIN without children), so a child is created only if it exists.
+    merged_fields = OrderedDict()
+    for key, values in keys_for_merge.items():
+        fields = [(v.split('__', 1)[-1], v) for v in values]
+        id_field = next((v for name, v in fields if name == 'id'), None)
+        merged_fields[key] = (id_field, fields)
+
     # Group all rows by field_id. In grouped rows replace fields in
     # accordance with keys_for_merge structure.
     for row in rows:
@@ -164,9 +199,9 @@ def _merge_table_rows(rows, keys_for_merge, field_id):
             for key in keys_for_merge:
                 merged_rows[row_id][key] = []
 
-        for key in keys_for_merge:
-            item = dotdict({v.split('__', 1)[-1]:row[v] for v in keys_for_merge[key]})
-            if item.id is not None:
+        for key, (id_field, fields) in merged_fields.items():
+            if id_field is not None and row[id_field] is not None:
+                item = dotdict((name, row[v]) for name, v in fields)
                 merged_rows[row_id][key].append(item)
 
     # Remove redundant keys from final objects
@@ -191,7 +226,7 @@ class JobAnnotation:
         # pylint: disable=bad-continuation
         self.logger = slogger.job[self.db_job.id]
         self.db_labels = {db_label.id:db_label
-            for db_label in db_segment.task.label_set.all()}
+            for db_label in db_segment.task.label_set.prefetch_related('attributespec_set').all()}
 
         self.db_attributes = {}
         for db_label in self.db_labels.values():
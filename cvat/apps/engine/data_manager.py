@@ -6,6 +6,11 @@ from shapely import geometry
 
 from . import models
 
+# Shape types are compared for every shape, so plain strings are used instead
+# of looking up members of models.ShapeType each time
+RECTANGLE = models.ShapeType.RECTANGLE.value
+POLYGON = models.ShapeType.POLYGON.value
+POLYLINE = models.ShapeType.POLYLINE.value
 
 class DataManager:
     def __init__(self, data):
@@ -67,12 +72,15 @@ class ObjectManager:
 
     def merge(self, objects, start_frame, overlap):
         # 1. Split objects on two parts: new and which can be intersected
-        # with existing objects.
-        new_objects = [obj for obj in objects
-            if obj["frame"] >= start_frame + overlap]
-        int_objects = [obj for obj in objects
-            if obj["frame"] < start_frame + overlap]
-        assert len(new_objects) + len(int_objects) == len(objects)
+        # with existing objects. Every object goes to exactly one part, so
+        # the objects are split in one pass.
+        new_objects = []
+        int_objects = []
+        for obj in objects:
+            if obj["frame"] >= start_frame + overlap:
+                new_objects.append(obj)
+            else:
+                int_objects.append(obj)
 
         # 2. Convert to more convenient data structure (objects by frame)
         int_objects_by_frame = self._get_objects_by_frame(int_objects, start_frame)
@@ -194,12 +202,12 @@ class ShapeManager(ObjectManager):
         has_same_type  = obj0["type"] == obj1["type"]
         has_same_label = obj0.get("label_id") == obj1.get("label_id")
         if has_same_type and has_same_label:
-            if obj0["type"] == models.ShapeType.RECTANGLE:
+            if obj0["type"] == RECTANGLE:
                 p0 = geometry.box(*obj0["points"])
                 p1 = geometry.box(*obj1["points"])
 
                 return _calc_polygons_similarity(p0, p1)
-            elif obj0["type"] == models.ShapeType.POLYGON:
+            elif obj0["type"] == POLYGON:
                 p0 = geometry.Polygon(pairwise(obj0["points"]))
                 p1 = geometry.Polygon(pairwise(obj0["points"]))
 
@@ -308,8 +316,8 @@ class TrackManager(ObjectManager):
         def interpolate(shape0, shape1):
             shapes = []
             is_same_type = shape0["type"] == shape1["type"]
-            is_polygon = shape0["type"] == models.ShapeType.POLYGON
-            is_polyline = shape0["type"] == models.ShapeType.POLYLINE
+            is_polygon = shape0["type"] == POLYGON
+            is_polyline = shape0["type"] == POLYLINE
             is_same_size = len(shape0["points"]) == len(shape1["points"])
             if not is_same_type or is_polygon or is_polyline or not is_same_size:
                 shape0 = TrackManager.normalize_shape(shape0)
@@ -345,9 +353,11 @@ class TrackManager(ObjectManager):
         for shape in track["shapes"]:
             if prev_shape:
                 assert shape["frame"] > curr_frame
+                spec_ids = set(attr["spec_id"] for attr in shape["attributes"])
                 for attr in prev_shape["attributes"]:
-                    if attr["spec_id"] not in map(lambda el: el["spec_id"], shape["attributes"]):
+                    if attr["spec_id"] not in spec_ids:
                         shape["attributes"].append(copy.deepcopy(attr))
+                        spec_ids.add(attr["spec_id"])
                 if not prev_shape["outside"]:
                     shapes.extend(interpolate(prev_shape, shape))
 
@@ -357,7 +367,7 @@ class TrackManager(ObjectManager):
             prev_shape = shape
 
         # TODO: Need to modify a client and a database (append "outside" shapes for polytracks)
-        if not prev_shape["outside"] and prev_shape["type"] == models.ShapeType.RECTANGLE:
+        if not prev_shape["outside"] and prev_shape["type"] == RECTANGLE:
             shape = copy.copy(prev_shape)
             shape["frame"] = end_frame
             shapes.extend(interpolate(prev_shape, shape))
@@ -0,0 +1,21 @@
+# Copyright (C) 2020 Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+
+from django.core.management.base import BaseCommand
+from cvat.apps.engine.annotation import clear_dump_files
+import time
+
+INTERVAL_SEC = 1800
+DUMP_FILE_TTL_SEC = 24 * 60 * 60
+
+class Command(BaseCommand):
+    help = 'Run a regular removing of outdated annotation dump files'
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                clear_dump_files(DUMP_FILE_TTL_SEC)
+            except Exception as ex:
+                print("An error occured during removing of dump files: {}".format(str(ex)))
+            time.sleep(INTERVAL_SEC)
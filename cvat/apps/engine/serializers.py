@@ -8,6 +8,7 @@ import shutil
 
 from rest_framework import serializers
 from django.contrib.auth.models import User, Group
+from django.utils import timezone
 
 from cvat.apps.engine import models
 from cvat.apps.engine.log import slogger
@@ -275,6 +276,9 @@ class TaskSerializer(WriteOnceMixin, serializers.ModelSerializer):
                     db_attr.values = attr.get('values', db_attr.values)
                     db_attr.save()
 
+        # Labels, attributes and other fields of the task are a part of annotation
+        # dumps, so the date is used to find outdated dumps as well
+        instance.updated_date = timezone.now()
         instance.save()
         return instance
 
@@ -0,0 +1,63 @@
+# Copyright (C) 2020 Intel Corporation
+#
+# SPDX-License-Identifier: MIT
+
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from cvat.apps.engine import annotation
+
+class ClearDumpFilesTestCase(SimpleTestCase):
+    def setUp(self):
+        self.data_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_root)
+
+    def _create_file(self, path, age):
+        path = os.path.join(self.data_root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'w').close()
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+
+        return path
+
+    def test_remove_outdated_dump_files(self):
+        old_dump = self._create_file('1/my_task_1.user.2020_01_02_10_20_30.xml', 100)
+        new_dump = self._create_file('1/my_task_1.user.2020_01_02_10_20_31.zip', 1)
+        other_files = [
+            self._create_file('1/client.log', 100),
+            self._create_file('1/my_task_1.2020_01_02.xml', 100),
+            self._create_file('1/.upload/image.2020_01_02_10_20_30.jpg', 100),
+            self._create_file('my_task_1.user.2020_01_02_10_20_30.xml', 100),
+        ]
+
+        with override_settings(DATA_ROOT=self.data_root):
+            annotation.clear_dump_files(max_age=50)
+
+        self.assertFalse(os.path.exists(old_dump))
+        for path in [new_dump] + other_files:
+            self.assertTrue(os.path.exists(path), path)
+
+    def test_skip_removed_task_directory(self):
+        removed_task_dump = self._create_file('1/my_task_1.user.2020_01_02_10_20_30.xml', 100)
+        old_dump = self._create_file('2/my_task_2.user.2020_01_02_10_20_30.xml', 100)
+        removed_task_dir = os.path.dirname(removed_task_dump)
+        scandir = os.scandir
+
+        def scandir_with_removed_task(path):
+            if path == removed_task_dir:
+                raise FileNotFoundError(path)
+            return scandir(path)
+
+        with override_settings(DATA_ROOT=self.data_root), \
+            mock.patch('cvat.apps.engine.annotation.os.scandir',
+                side_effect=scandir_with_removed_task):
+            annotation.clear_dump_files(max_age=50)
+
+        self.assertTrue(os.path.exists(removed_task_dump))
+        self.assertFalse(os.path.exists(old_dump))
@@ -2857,6 +2857,51 @@ class TaskAnnotationAPITestCase(JobAnnotationAPITestCase):
         response = self._get_api_v1_tasks_id_annotations(task["id"], user)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def _run_api_v1_tasks_id_annotations_dump_outdated(self, owner, assignee, annotator):
+        task, _ = self._create_task(owner, assignee)
+        images_format = "format=CVAT XML 1.1 for images"
+        videos_format = "format=CVAT XML 1.1 for videos"
+
+        def check_new_dump(query_params):
+            response = self._dump_api_v1_tasks_id_annotations(task["id"], annotator, query_params)
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+            response = self._dump_api_v1_tasks_id_annotations(task["id"], annotator, query_params)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        data = {
+            "version": 0,
+            "tags": [],
+            "shapes": [{
+                "frame": 0,
+                "label_id": task["labels"][1]["id"],
+                "group": 0,
+                "attributes": [],
+                "points": [2.0, 2.1, 40, 50.7],
+                "type": "rectangle",
+                "occluded": False
+            }],
+            "tracks": [],
+        }
+        response = self._put_api_v1_tasks_id_annotations(task["id"], annotator, data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        check_new_dump(images_format)
+
+        # another format is requested with the same file name
+        check_new_dump(videos_format)
+
+        # annotations are changed
+        response = self._put_api_v1_tasks_id_annotations(task["id"], annotator, data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        check_new_dump(videos_format)
+
+        # labels of the task are changed
+        with ForceLogin(owner, self.client):
+            response = self.client.patch("/api/v1/tasks/{}".format(task["id"]),
+                data={"labels": [{"name": "bicycle"}]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        check_new_dump(videos_format)
+
     def test_api_v1_tasks_id_annotations_admin(self):
         self._run_api_v1_tasks_id_annotations(self.admin, self.assignee,
             self.assignee)
@@ -2882,6 +2927,10 @@ class TaskAnnotationAPITestCase(JobAnnotationAPITestCase):
     def test_api_v1_tasks_id_annotations_upload_coco_user(self):
         self._run_coco_annotation_upload_test(self.user)
 
+    def test_api_v1_tasks_id_annotations_dump_outdated_user(self):
+        self._run_api_v1_tasks_id_annotations_dump_outdated(self.user, self.assignee,
+            self.assignee)
+
 class ServerShareAPITestCase(APITestCase):
     def setUp(self):
         self.client = APIClient()
@@ -345,13 +345,18 @@ class TaskViewSet(auth.TaskGetQuerySetMixin, viewsets.ModelViewSet):
         file_path = os.path.join(db_task.get_task_dirname(),
             "{}.{}.{}.{}".format(filename, username, timestamp, db_dumper.format.lower()))
 
+        # A finished dump is valid only while the task annotations have not been
+        # changed and the same format is requested
+        dump_signature = "{}@{}".format(db_task.updated_date.isoformat(), db_dumper.display_name)
+
         queue = django_rq.get_queue("default")
         rq_id = "{}@/api/v1/tasks/{}/annotations/{}".format(username, pk, filename)
         rq_job = queue.fetch_job(rq_id)
 
         if rq_job:
             if rq_job.is_finished:
-                if not rq_job.meta.get("download"):
+                if not rq_job.meta.get("download") and \
+                    rq_job.meta.get("signature") == dump_signature:
                     if action == "download":
                         rq_job.meta[action] = True
                         rq_job.save_meta()
@@ -359,7 +364,7 @@ class TaskViewSet(auth.TaskGetQuerySetMixin, viewsets.ModelViewSet):
                             attachment_filename="{}.{}".format(filename, db_dumper.format.lower()))
                     else:
                         return Response(status=status.HTTP_201_CREATED)
-                else: # Remove the old dump file
+                else: # Remove the old or stale dump file
                     try:
                         os.remove(rq_job.meta["file_path"])
                     except OSError:
@@ -380,6 +385,7 @@ class TaskViewSet(auth.TaskGetQuerySetMixin, viewsets.ModelViewSet):
             job_id=rq_id,
         )
         rq_job.meta["file_path"] = file_path
+        rq_job.meta["signature"] = dump_signature
         rq_job.save_meta()
 
         return Response(status=status.HTTP_202_ACCEPTED)
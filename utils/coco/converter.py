@@ -9,10 +9,13 @@ from __future__ import absolute_import, division, print_function
 import argparse
 import glog as log
 import numpy as np
+import os
 import os.path as osp
 import json
-import cv2
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
 from lxml import etree
 from tqdm import tqdm
 from skimage import measure
@@ -20,6 +23,22 @@ from pycocotools import mask as mask_util
 from pycocotools import coco as coco_loader
 
 
+# Segmentation which replaces segments that became empty after cropping, because
+# cocoapi cannot process empty ones. Such segments are not written to output
+EMPTY_SEGMENTATION = [[0.0, 0.0, 0.0, 0.0, 0.0, 0.0]]
+
+# Number of images which are read before their overlapped polygons are cropped
+IMAGE_BATCH_SIZE = 1024
+
+
+def positive_int(value):
+    """Parse positive integer argument of command line"""
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError('{} is not a positive integer'.format(value))
+    return number
+
+
 def parse_args():
     """Parse arguments of command line"""
     parser = argparse.ArgumentParser(
@@ -57,6 +76,10 @@ def parse_args():
         '--polygon-area-threshold', type=int, default=1,
         help='polygons with area less than this value will be ignored. By default set to 1'
     )
+    parser.add_argument(
+        '--jobs', type=positive_int, default=os.cpu_count(),
+        help='number of processes to crop overlapped polygons. By default is equal to number of CPUs'
+    )
     return parser.parse_args()
 
 
@@ -79,13 +102,8 @@ def mask_to_polygon(mask, tolerance=1.0, area_threshold=1):
         contour = measure.approximate_polygon(contour, tolerance)
         if len(contour) > 2:
             contour = np.flip(contour, axis=1)
-            reshaped_contour = []
-            for xy in contour:
-                reshaped_contour.append(xy[0])
-                reshaped_contour.append(xy[1])
-            for i in range(0, len(reshaped_contour)):
-                if reshaped_contour[i] < 0:
-                    reshaped_contour[i] = 0
+            # interleave (x, y) pairs and clip negative coordinates in one pass
+            reshaped_contour = np.maximum(contour, 0).ravel().tolist()
             # Check if area of a polygon is enough
             rle = mask_util.frPyObjects([reshaped_contour], mask.shape[0], mask.shape[1])
             area = mask_util.area(rle)
@@ -102,6 +120,9 @@ def draw_polygons(polygons, img_name, input_dir, output_dir, draw_labels):
         input_dir: path to directory with images from annotation
         output_dir: directory to save images
     """
+    # OpenCV is needed only for drawing, so it is not imported at start
+    import cv2
+
     name = osp.basename(img_name)
     input_file = osp.join(input_dir, name)
     output_file = osp.join(output_dir, name)
@@ -145,28 +166,27 @@ def fix_segments_intersections(polygons, height, width, img_name, use_background
             inside another one and we don't want make "hole" in one of objects
     """
     converted_polygons = []
-    empty_polygon = [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
     # Convert points of polygons from string to coco's array.
     # All polygons must be sorted in order from bottom to top
     for polygon in polygons:
         label = polygon['label']
-        points = polygon['points'].split(';')
-        new_polygon = []
-        for xy in points:
-            x = float(xy.split(',')[0])
-            y = float(xy.split(',')[1])
-            new_polygon.append(x)
-            new_polygon.append(y)
+        # Coordinates are parsed by NumPy in one pass without intermediate strings
+        new_polygon = np.fromstring(polygon['points'].replace(';', ','), dtype=np.float64, sep=',').tolist()
         converted_polygons.append({'label': label, 'points': new_polygon})
 
+    # Points of the objects are changed only while they are at the bottom,
+    # so RLEs and areas of the objects above can be computed once
+    rles = [mask_util.frPyObjects([polygon['points']], height, width) for polygon in converted_polygons]
+    areas = [sum(mask_util.area(rle)) for rle in rles]
+
     for i in range(0, len(converted_polygons)):
-        rle_bottom = mask_util.frPyObjects([converted_polygons[i]['points']], height, width)
+        rle_bottom = rles[i]
+        area_bottom = areas[i]
         segment_overlapped = False
         for j in range(i + 1, len(converted_polygons)):
-            rle_top = mask_util.frPyObjects([converted_polygons[j]['points']], height, width)
+            rle_top = rles[j]
             iou = mask_util.iou(rle_bottom, rle_top, [0, 0])
-            area_top = sum(mask_util.area(rle_top))
-            area_bottom = sum(mask_util.area(rle_bottom))
+            area_top = areas[j]
             if area_bottom == 0:
                 continue
             area_ratio = area_top / area_bottom
@@ -182,19 +202,18 @@ def fix_segments_intersections(polygons, height, width, img_name, use_background
 
             if sum_iou[0] > threshold:
                 segment_overlapped = True
-                bottom_mask = np.array(mask_util.decode(rle_bottom), dtype=np.uint8)
-                top_mask = np.array(mask_util.decode(rle_top), dtype=np.uint8)
-
-                bottom_mask = np.subtract(bottom_mask, top_mask)
-                bottom_mask[bottom_mask > 1] = 0
-
-                bottom_mask = np.sum(bottom_mask, axis=2)
-                bottom_mask = np.array(bottom_mask > 0, dtype=np.uint8)
+                # Keep pixels of the bottom object which are not covered by the top one.
+                # Decoded masks are uint8 already, so they are reduced without extra copies
+                bottom_mask = mask_util.decode(rle_bottom).any(axis=2)
+                top_mask = mask_util.decode(rle_top).any(axis=2)
+                bottom_mask = np.logical_and(bottom_mask, np.logical_not(top_mask, out=top_mask),
+                    out=bottom_mask).view(np.uint8)
                 converted_polygons[i]['points'] = mask_to_polygon(bottom_mask, area_threshold=area_threshold)
                 # If some segment is empty, do small fix to avoid error in cocoapi function
                 if len(converted_polygons[i]['points']) == 0:
-                    converted_polygons[i]['points'] = [empty_polygon]
+                    converted_polygons[i]['points'] = EMPTY_SEGMENTATION
                 rle_bottom = mask_util.frPyObjects(converted_polygons[i]['points'], height, width)
+                area_bottom = sum(mask_util.area(rle_bottom))
         if not segment_overlapped:
             converted_polygons[i]['points'] = [converted_polygons[i]['points']]
 
@@ -203,7 +222,7 @@ def fix_segments_intersections(polygons, height, width, img_name, use_background
         if not use_background_label and converted_polygons[i]['label'] == 'background':
             continue
         poly_len = len(converted_polygons[i]['points'])
-        if poly_len == 0 or converted_polygons[i]['points'] == [empty_polygon]:
+        if poly_len == 0 or converted_polygons[i]['points'] == EMPTY_SEGMENTATION:
             log.warning('Image <{}> has an empty polygon with label <{}>. '
                         'Perhaps there is a mistake in annotation'.
                         format(img_name, converted_polygons[i]['label']))
@@ -242,27 +261,24 @@ def insert_license_data(result_annotation):
     })
 
 
-def insert_info_data(xml_root, result_annotation):
+def insert_info_data(version, xml_meta, result_annotation):
     """Fill available information of annotation
     Args:
-        xml_root: root for xml parser
+        version: version of CVAT annotation format
+        xml_meta: element <meta> of input annotation. May be None if it is absent
         result_annotation: output annotation in COCO representation
     """
     log.info('Reading information data...')
-    version = ''
     date = ''
     description = ''
     year = ''
-    for child in xml_root:
-        if child.tag == 'version':
-            version = child.text
-        if child.tag == 'meta':
-            for task in child:
-                for entry in task:
-                    if entry.tag == 'name':
-                        description = entry.text
-                    if entry.tag == 'created':
-                        date = entry.text
+    if xml_meta is not None:
+        for task in xml_meta:
+            for entry in task:
+                if entry.tag == 'name':
+                    description = entry.text
+                if entry.tag == 'created':
+                    date = entry.text
     date = date.split(' ')[0]
     year = date.split('-')[0]
     result_annotation['info'] = {
@@ -276,10 +292,10 @@ def insert_info_data(xml_root, result_annotation):
     log.info('Found the next information data: {}'.format(result_annotation['info']))
 
 
-def insert_categories_data(xml_root, use_background_label, result_annotation, labels_file=None):
+def insert_categories_data(xml_meta, use_background_label, result_annotation, labels_file=None):
     """Get labels from input annotation and fill categories field in output annotation
     Args:
-        xml_root: root for xml parser
+        xml_meta: element <meta> of input annotation. May be None if it is absent
         use_background_label: key to enable using label background
         result_annotation: output annotation in COCO representation
         labels_file: path to file with labels names.
@@ -314,7 +330,8 @@ def insert_categories_data(xml_root, use_background_label, result_annotation, la
 
     if labels_file is None:
         log.info('Reading labels from annotation...')
-        for label in xml_root.iter('label'):
+        labels = xml_meta.iter('label') if xml_meta is not None else []
+        for label in labels:
             for name in label.findall("./name"):
                 if name.text == 'background':
                     bg_found = True
@@ -393,6 +410,31 @@ def insert_annotation_data(image, category_map, segm_id, object, img_dims, resul
     result_annotation['annotations'].append(new_anno)
 
 
+def write_annotation(result_annotation, outfile):
+    """Write annotation to the file record by record. Every record is serialized
+        by one-shot encoding which uses C implementation of JSON encoder
+    Args:
+        result_annotation: output annotation in COCO representation
+        outfile: text file object for output annotation
+    """
+    encoder = json.JSONEncoder(separators=(',', ':'))
+    outfile.write('{')
+    for key_idx, (key, value) in enumerate(result_annotation.items()):
+        if key_idx:
+            outfile.write(',')
+        outfile.write(encoder.encode(key) + ':')
+        if isinstance(value, dict):
+            outfile.write(encoder.encode(value))
+        else:
+            outfile.write('[')
+            for record_idx, record in enumerate(value):
+                if record_idx:
+                    outfile.write(',')
+                outfile.write(encoder.encode(record))
+            outfile.write(']')
+    outfile.write('}')
+
+
 def main():
     args = parse_args()
     xml_file_name = args.cvat_xml
@@ -401,7 +443,6 @@ def main():
     else:
         output_file_name = args.cvat_xml.split('.xml')[0] + '.json'
         log.info('Output file name set to: {}'.format(output_file_name))
-    root = etree.parse(xml_file_name).getroot()
 
     if args.draw is not None:
         log.info('Draw key was enabled. Images will be saved in directory <{}>'.format(args.draw))
@@ -415,57 +456,119 @@ def main():
     }
 
     insert_license_data(result_annotation)
-    insert_info_data(root, result_annotation)
-    category_map = insert_categories_data(root, args.use_background_label, result_annotation, labels_file=args.labels)
-
-    if len(category_map) == 0:
-        sys.exit('Labels were not found. Be sure that annotation <{}> includes field <labels> or '
-                 'annotation directory includes file <labels.txt>'.format(xml_file_name))
-
-    segm_id = 0
-    z_order_off_counter = 0
-    # Parse original annotation
-    for img in tqdm(root.iter('image'), desc='Processing images from ' + xml_file_name):
-        image = {}
-        for key, value in img.items():
-            image[key] = value
-        img_name = osp.join(args.image_dir, osp.basename(image['name']))
-        if not osp.isfile(img_name):
-            log.warning('Image <{}> is not available'.format(img_name))
-        image['polygon'] = []
-        z_order_on_counter = 0
-        polygon_counter = 0
-        for poly in img.iter('polygon'):
-            polygon = {}
-            for key, value in poly.items():
-                polygon[key] = value
-                if key == 'z_order':
-                    z_order_on_counter += 1
-            polygon_counter += 1
-            image['polygon'].append(polygon)
-        # If at least one of polygons on image does not have field 'z_order' do not sort them
-        if z_order_on_counter == polygon_counter:
-            image['polygon'].sort(key=lambda x: int(x['z_order']))
-        else:
-            z_order_off_counter += 1
-
-        # Create new image
-        image['id'] = int(image['id'])
-        insert_image_data(image, result_annotation)
-        height = result_annotation['images'][-1]['height']
-        width = result_annotation['images'][-1]['width']
-        image['polygon'] = fix_segments_intersections(image['polygon'], height, width,
-                                                      image['name'], args.use_background_label,
-                                                      area_threshold=args.polygon_area_threshold)
-
-        # Create new annotation for this image
-        for poly in image['polygon']:
-            insert_annotation_data(image, category_map, segm_id, poly, [height, width], result_annotation)
-            segm_id += 1
-
-        # Draw contours of objects on image
+
+    def insert_meta_data(version, xml_meta):
+        insert_info_data(version, xml_meta, result_annotation)
+        category_map = insert_categories_data(xml_meta, args.use_background_label, result_annotation,
+                                              labels_file=args.labels)
+        if len(category_map) == 0:
+            sys.exit('Labels were not found. Be sure that annotation <{}> includes field <labels> or '
+                     'annotation directory includes file <labels.txt>'.format(xml_file_name))
+        return category_map
+
+    # Drawing is dominated by image decoding/encoding in OpenCV which releases GIL,
+    # so images are drawn in background threads while annotation is converted.
+    # Cropping of overlapped polygons is CPU-bound and independent for each image,
+    # so images are processed in parallel by separate processes
+    with ExitStack() as stack:
+        executor = stack.enter_context(ProcessPoolExecutor(max_workers=args.jobs))
+        draw_executor = None
         if args.draw is not None:
-            draw_polygons(image['polygon'], image['name'], args.image_dir, args.draw, args.draw_labels)
+            draw_executor = stack.enter_context(ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)))
+        fix_image_segments = partial(fix_segments_intersections,
+                                     use_background_label=args.use_background_label,
+                                     area_threshold=args.polygon_area_threshold)
+        jobs = args.jobs or os.cpu_count() or 1
+        draw_jobs = []
+        segm_id = 0
+
+        def process_images(images):
+            """Crop overlapped polygons of images, then create annotations and draw images"""
+            nonlocal draw_jobs, segm_id
+            # Images usually have few polygons, so they are sent to processes in chunks
+            # to avoid a round trip for every image. Several chunks per process are
+            # kept to balance the load
+            fixed_polygons = executor.map(fix_image_segments,
+                                          [image['polygon'] for image in images],
+                                          [int(image['height']) for image in images],
+                                          [int(image['width']) for image in images],
+                                          [image['name'] for image in images],
+                                          chunksize=max(1, len(images) // (jobs * 4)))
+
+            prev_draw_jobs, draw_jobs = draw_jobs, []
+            for image, polygons in zip(images, fixed_polygons):
+                image['polygon'] = polygons
+
+                # Create new annotation for this image
+                for poly in image['polygon']:
+                    insert_annotation_data(image, category_map, segm_id, poly,
+                                           [int(image['height']), int(image['width'])], result_annotation)
+                    segm_id += 1
+
+                # Draw contours of objects on image
+                if draw_executor is not None:
+                    draw_jobs.append(draw_executor.submit(draw_polygons, image['polygon'], image['name'],
+                                                          args.image_dir, args.draw, args.draw_labels))
+
+            # Drawings of the previous batch are waited for only now, so they overlap with
+            # cropping of this batch, but polygons of older batches are not kept in the queue
+            for job in prev_draw_jobs:
+                # Propagate exceptions raised while drawing
+                job.result()
+
+        version = ''
+        category_map = None
+        images = []
+        z_order_off_counter = 0
+        # Parse original annotation. The file is read element by element and already
+        # processed elements are dropped, so the whole tree is never kept in memory.
+        # Images are cropped in batches as they are read, so only polygons of one batch
+        # are kept besides the output annotation.
+        # huge_tree allows text nodes over default limits of libxml2 and entities are
+        # not resolved to protect from XXE attacks
+        context = etree.iterparse(xml_file_name, events=('end',), tag=('version', 'meta', 'image'),
+                                  huge_tree=True, remove_blank_text=True, remove_comments=True,
+                                  resolve_entities=False)
+        for _, elem in tqdm(context, desc='Converting images from ' + xml_file_name):
+            if elem.tag == 'version':
+                version = elem.text
+            elif elem.tag == 'meta':
+                category_map = insert_meta_data(version, elem)
+            else:
+                if category_map is None:
+                    category_map = insert_meta_data(version, None)
+                # Attributes are copied by lxml itself instead of key by key
+                image = dict(elem.attrib)
+                img_name = osp.join(args.image_dir, osp.basename(image['name']))
+                if not osp.isfile(img_name):
+                    log.warning('Image <{}> is not available'.format(img_name))
+                image['polygon'] = [dict(poly.attrib) for poly in elem.iterchildren('polygon')]
+                # If at least one of polygons on image does not have field 'z_order' do not sort them
+                if all('z_order' in polygon for polygon in image['polygon']):
+                    image['polygon'].sort(key=lambda x: int(x['z_order']))
+                else:
+                    z_order_off_counter += 1
+
+                # Create new image
+                image['id'] = int(image['id'])
+                insert_image_data(image, result_annotation)
+                images.append(image)
+                if len(images) == IMAGE_BATCH_SIZE:
+                    process_images(images)
+                    images = []
+
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+        del context
+
+        if category_map is None:
+            category_map = insert_meta_data(version, None)
+        if images:
+            process_images(images)
+        for job in draw_jobs:
+            # Propagate exceptions raised while drawing
+            job.result()
 
     log.info('Processed images: {}'.format(len(result_annotation['images'])))
     log.info('Processed objects: {}'.format(len(result_annotation['annotations'])))
@@ -476,7 +579,7 @@ def main():
     # Save created annotation
     log.info('Saving annotation...')
     with open(output_file_name, 'w') as outfile:
-        json.dump(result_annotation, outfile)
+        write_annotation(result_annotation, outfile)
     log.info('Annotation was saved in <{}> successfully'.format(output_file_name))
 
     # Try to load created annotation via cocoapi
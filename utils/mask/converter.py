@@ -11,10 +11,18 @@ import os
 import glog as log
 import numpy as np
 import cv2
+from concurrent.futures import ThreadPoolExecutor
 from lxml import etree
 from tqdm import tqdm
 
 
+def positive_int(value):
+    """Parse positive integer argument of command line"""
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError('{} is not a positive integer'.format(value))
+    return number
+
 def parse_args():
     """Parse arguments of command line"""
     parser = argparse.ArgumentParser(
@@ -49,25 +57,26 @@ def parse_args():
         help='directory for output masks'
     )
 
+    parser.add_argument(
+        '--jobs', type=positive_int, default=os.cpu_count(),
+        help='number of threads to generate masks (by default: number of CPUs)'
+    )
+
     return parser.parse_args()
 
 def parse_anno_file(cvat_xml):
-    root = etree.parse(cvat_xml).getroot()
     anno = []
-    for image_tag in root.iter('image'):
-        image = {}
-        for key, value in image_tag.items():
-            image[key] = value
-        image['shapes'] = []
-        for poly_tag in image_tag.iter('polygon'):
-            polygon = {'type': 'polygon'}
-            for key, value in poly_tag.items():
-                polygon[key] = value
-            image['shapes'].append(polygon)
-        for box_tag in image_tag.iter('box'):
-            box = {'type': 'box'}
-            for key, value in box_tag.items():
-                box[key] = value
+    # Stream the file instead of building the whole tree in memory. huge_tree allows
+    # text nodes over default limits of libxml2 and entities are not resolved to
+    # protect from XXE attacks
+    context = etree.iterparse(cvat_xml, events=('end',), tag='image', huge_tree=True,
+                              remove_blank_text=True, remove_comments=True, resolve_entities=False)
+    for _, image_tag in context:
+        # Attributes are copied by lxml itself instead of key by key
+        image = dict(image_tag.attrib)
+        image['shapes'] = [dict(poly_tag.attrib, type='polygon') for poly_tag in image_tag.iterchildren('polygon')]
+        for box_tag in image_tag.iterchildren('box'):
+            box = dict(box_tag.attrib, type='box')
             box['points'] = "{0},{1};{2},{1};{2},{3};{0},{3}".format(
                 box['xtl'], box['ytl'], box['xbr'], box['ybr'])
             image['shapes'].append(box)
@@ -75,16 +84,25 @@ def parse_anno_file(cvat_xml):
         image['shapes'].sort(key=lambda x: int(x.get('z_order', 0)))
         anno.append(image)
 
+        # Free the processed subtree and already handled siblings
+        image_tag.clear()
+        while image_tag.getprevious() is not None:
+            del image_tag.getparent()[0]
+
     return anno
 
 def create_mask_file(mask_path, width, height, bitness, color_map, background, shapes):
     mask = np.full((height, width, bitness // 8), background, dtype=np.uint8)
-    for shape in shapes:
-        color = color_map.get(shape['label'], background)
-        points = [tuple(map(float, p.split(','))) for p in shape['points'].split(';')]
-        points = np.array([(int(p[0]), int(p[1])) for p in points])
-
-        mask = cv2.fillPoly(mask, [points], color=color)
+    if shapes:
+        # Points of all shapes are parsed by one call and then split per shape
+        # into views of the same array
+        points = np.fromstring(';'.join(shape['points'] for shape in shapes).replace(';', ','),
+            dtype=np.float64, sep=',')
+        points = points.reshape(-1, 2).astype(np.int32)
+        offsets = np.cumsum([shape['points'].count(';') + 1 for shape in shapes])
+        for shape, shape_points in zip(shapes, np.split(points, offsets[:-1])):
+            color = color_map.get(shape['label'], background)
+            mask = cv2.fillPoly(mask, [shape_points], color=color)
     cv2.imwrite(mask_path, mask)
 
 def to_scalar(str, dim):
@@ -104,7 +122,7 @@ def main():
         color_map[label] = to_scalar(color, dim)
     background = to_scalar(args.background_color, dim)
 
-    for image in tqdm(anno, desc='Generate masks'):
+    def generate_mask(image):
         mask_path = os.path.join(args.output_dir, os.path.splitext(image['name'])[0] + '.png')
         mask_dir = os.path.dirname(mask_path)
         if mask_dir:
@@ -112,6 +130,12 @@ def main():
         create_mask_file(mask_path, int(image['width']), int(image['height']),
             args.mask_bitness, color_map, background, image['shapes'])
 
+    # Masks of different images are independent and OpenCV releases GIL
+    # while drawing and encoding them, so images are processed in threads
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        for _ in tqdm(executor.map(generate_mask, anno), total=len(anno), desc='Generate masks'):
+            pass
+
 
 if __name__ == "__main__":
     main()
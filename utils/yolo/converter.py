@@ -15,6 +15,13 @@ import glog as log
 from lxml import etree
 import requests
 
+# Large annotations may contain text nodes which exceed default limits of libxml2.
+# External entities are never resolved to protect from XXE attacks
+XML_PARSER = etree.XMLParser(huge_tree=True, remove_blank_text=True, remove_comments=True,
+                             resolve_entities=False)
+# Boxes are looked up in every track and image, so the expression is compiled once
+FIND_BOXES = etree.XPath('box')
+
 
 def parse_args():
     """Parse arguments of command line"""
@@ -74,7 +81,7 @@ def process_cvat_xml(xml_file, image_dir, output_dir,username,password,ilabels):
         os.makedirs(image_dir, exist_ok=True)
 
     os.makedirs(output_dir, exist_ok=True)
-    cvat_xml = etree.parse(xml_file)
+    cvat_xml = etree.parse(xml_file, parser=XML_PARSER)
     basename = os.path.splitext( os.path.basename( xml_file ) )[0]
     current_labels = {}
     traintxt = ""
@@ -93,7 +100,7 @@ def process_cvat_xml(xml_file, image_dir, output_dir,username,password,ilabels):
         for track in tracks:
             trackid = int(track.get("id"))
             label = track.get("label")
-            boxes = track.findall( './box' )
+            boxes = FIND_BOXES(track)
             for box in boxes:
                 frameid  = int(box.get('frame'))
                 outside  = int(box.get('outside'))
@@ -218,7 +225,7 @@ def process_cvat_xml(xml_file, image_dir, output_dir,username,password,ilabels):
 
             _yoloAnnotationContent = ""
 
-            for box in img_tag.findall('box'):
+            for box in FIND_BOXES(img_tag):
                 label = box.get('label')
                 xmin = float(box.get('xtl'))
                 ymin = float(box.get('ytl'))